@@ -1,4 +1,5 @@
 """Utilities for reading real time clocks and keeping soft real time constraints."""
+import ctypes
 import gc
 import os
 import time
@@ -38,6 +39,17 @@ def set_core_affinity(cores: List[int]) -> None:
     os.sched_setaffinity(0, cores)
 
 
+def lock_memory() -> None:
+  # lock the pages mapped so far in RAM, avoids page fault jitter in the loop.
+  # call once everything is allocated, later mappings are not locked
+  if not PC:
+    MCL_CURRENT = 1
+    libc = ctypes.CDLL("libc.so.6", use_errno=True)
+    if libc.mlockall(MCL_CURRENT) != 0:
+      errno = ctypes.get_errno()
+      raise OSError(errno, os.strerror(errno))
+
+
 def config_realtime_process(cores: Union[int, List[int]], priority: int) -> None:
   gc.disable()
   set_realtime_priority(priority)
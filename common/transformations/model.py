@@ -62,17 +62,22 @@ medmodel_frame_from_bigmodel_frame = np.dot(medmodel_intrinsics, np.linalg.inv(b
 calib_from_medmodel = np.linalg.inv(medmodel_frame_from_calib_frame[:, :3])
 calib_from_sbigmodel = np.linalg.inv(sbigmodel_frame_from_calib_frame[:, :3])
 
+# constant part of the warp, camera intrinsics applied to the device to view frame rotation
+tici_ecam_from_device = tici_ecam_intrinsics @ view_frame_from_device_frame
+tici_fcam_from_device = tici_fcam_intrinsics @ view_frame_from_device_frame
+eon_fcam_from_device = eon_fcam_intrinsics @ view_frame_from_device_frame
+
 # This function is verified to give similar results to xx.uncommon.utils.transform_img
 def get_warp_matrix(device_from_calib_euler: np.ndarray, wide_camera: bool = False, bigmodel_frame: bool = False, tici: bool = True) -> np.ndarray:
   if tici and wide_camera:
-    cam_intrinsics = tici_ecam_intrinsics
+    camera_from_device = tici_ecam_from_device
   elif tici:
-    cam_intrinsics = tici_fcam_intrinsics
+    camera_from_device = tici_fcam_from_device
   else:
-    cam_intrinsics = eon_fcam_intrinsics
+    camera_from_device = eon_fcam_from_device
 
   calib_from_model = calib_from_sbigmodel if bigmodel_frame else calib_from_medmodel
   device_from_calib = rot_from_euler(device_from_calib_euler)
-  camera_from_calib = cam_intrinsics @ view_frame_from_device_frame @ device_from_calib
+  camera_from_calib = camera_from_device @ device_from_calib
   warp_matrix: np.ndarray = camera_from_calib @ calib_from_model
   return warp_matrix
@@ -14,7 +14,7 @@ from openpilot.common.params import Params
 from openpilot.common.realtime import DT_MDL
 from openpilot.common.numpy_fast import interp
 from openpilot.common.filter_simple import FirstOrderFilter
-from openpilot.common.realtime import config_realtime_process
+from openpilot.common.realtime import config_realtime_process, lock_memory
 from openpilot.common.transformations.model import get_warp_matrix
 from openpilot.selfdrive import sentry
 from openpilot.selfdrive.modeld.runners import ModelRunner, Runtime
@@ -32,6 +32,9 @@ MODEL_PATHS = {
 
 METADATA_PATH = Path(__file__).parent / 'models/supercombo_metadata.pkl'
 
+# inputs copied as-is from the caller every frame
+COPIED_INPUTS = ('traffic_convention', 'nav_features', 'nav_instructions')
+
 class FrameMeta:
   frame_id: int = 0
   timestamp_sof: int = 0
@@ -41,26 +44,58 @@ class FrameMeta:
     if vipc is not None:
       self.frame_id, self.timestamp_sof, self.timestamp_eof = vipc.frame_id, vipc.timestamp_sof, vipc.timestamp_eof
 
+class HistoryBuffer:
+  # ring buffer of the last `n` entries, backed by an array of twice that length so the
+  # history is always available as one contiguous view without shifting the data
+  def __init__(self, n: int, width: int):
+    self.n = n
+    self.width = width
+    self.backing = np.zeros(2 * n * width, dtype=np.float32)
+    self.idx = 0
+
+  @property
+  def view(self) -> np.ndarray:
+    return self.backing[self.idx * self.width:(self.idx + self.n) * self.width]
+
+  def push(self, x: np.ndarray) -> None:
+    self.backing[self.idx * self.width:(self.idx + 1) * self.width] = x
+    self.backing[(self.idx + self.n) * self.width:(self.idx + self.n + 1) * self.width] = x
+    self.idx = (self.idx + 1) % self.n
+
 class ModelState:
   frame: ModelFrame
   wide_frame: ModelFrame
   inputs: Dict[str, np.ndarray]
   output: np.ndarray
   prev_desire: np.ndarray  # for tracking the rising edge of the pulse
+  desire_history: HistoryBuffer
+  features_history: HistoryBuffer
   model: ModelRunner
 
   def __init__(self, context: CLContext):
     self.frame = ModelFrame(context)
     self.wide_frame = ModelFrame(context)
     self.prev_desire = np.zeros(ModelConstants.DESIRE_LEN, dtype=np.float32)
-    self.inputs = {
-      'desire': np.zeros(ModelConstants.DESIRE_LEN * (ModelConstants.HISTORY_BUFFER_LEN+1), dtype=np.float32),
-      'traffic_convention': np.zeros(ModelConstants.TRAFFIC_CONVENTION_LEN, dtype=np.float32),
-      'lat_planner_state': np.zeros(ModelConstants.LAT_PLANNER_STATE_LEN, dtype=np.float32),
-      'nav_features': np.zeros(ModelConstants.NAV_FEATURE_LEN, dtype=np.float32),
-      'nav_instructions': np.zeros(ModelConstants.NAV_INSTRUCTION_LEN, dtype=np.float32),
-      'features_buffer': np.zeros(ModelConstants.HISTORY_BUFFER_LEN * ModelConstants.FEATURE_LEN, dtype=np.float32),
+    # scratch buffers for the rising edge detection
+    self.desire_diff = np.zeros(ModelConstants.DESIRE_LEN, dtype=np.float32)
+    self.desire_mask = np.zeros(ModelConstants.DESIRE_LEN, dtype=np.bool_)
+    self.desire_pulse = np.zeros(ModelConstants.DESIRE_LEN, dtype=np.float32)
+    self.desire_history = HistoryBuffer(ModelConstants.HISTORY_BUFFER_LEN+1, ModelConstants.DESIRE_LEN)
+    self.features_history = HistoryBuffer(ModelConstants.HISTORY_BUFFER_LEN, ModelConstants.FEATURE_LEN)
+    # the small inputs share one contiguous buffer, each input is a view into it
+    small_input_lens = {
+      'traffic_convention': ModelConstants.TRAFFIC_CONVENTION_LEN,
+      'lat_planner_state': ModelConstants.LAT_PLANNER_STATE_LEN,
+      'nav_features': ModelConstants.NAV_FEATURE_LEN,
+      'nav_instructions': ModelConstants.NAV_INSTRUCTION_LEN,
     }
+    self.small_inputs = np.zeros(sum(small_input_lens.values()), dtype=np.float32)
+    self.inputs = {'desire': self.desire_history.view}
+    offset = 0
+    for k, n in small_input_lens.items():
+      self.inputs[k] = self.small_inputs[offset:offset+n]
+      offset += n
+    self.inputs['features_buffer'] = self.features_history.view
 
     with open(METADATA_PATH, 'rb') as f:
       model_metadata = pickle.load(f)
@@ -86,19 +121,27 @@ class ModelState:
                 inputs: Dict[str, np.ndarray], prepare_only: bool) -> Optional[Dict[str, np.ndarray]]:
     # Model decides when action is completed, so desire input is just a pulse triggered on rising edge
     inputs['desire'][0] = 0
-    self.inputs['desire'][:-ModelConstants.DESIRE_LEN] = self.inputs['desire'][ModelConstants.DESIRE_LEN:]
-    self.inputs['desire'][-ModelConstants.DESIRE_LEN:] = np.where(inputs['desire'] - self.prev_desire > .99, inputs['desire'], 0)
+    np.subtract(inputs['desire'], self.prev_desire, out=self.desire_diff)
+    np.greater(self.desire_diff, .99, out=self.desire_mask)
+    np.multiply(inputs['desire'], self.desire_mask, out=self.desire_pulse)
+    self.desire_history.push(self.desire_pulse)
     self.prev_desire[:] = inputs['desire']
+    self.inputs['desire'] = self.desire_history.view
+    self.model.setInputBuffer("desire", self.inputs['desire'])
 
-    self.inputs['traffic_convention'][:] = inputs['traffic_convention']
-    self.inputs['nav_features'][:] = inputs['nav_features']
-    self.inputs['nav_instructions'][:] = inputs['nav_instructions']
+    for k in COPIED_INPUTS:
+      np.copyto(self.inputs[k], inputs[k])
     # self.inputs['driving_style'][:] = inputs['driving_style']
 
     # if getCLBuffer is not None, frame will be None
-    self.model.setInputBuffer("input_imgs", self.frame.prepare(buf, transform.flatten(), self.model.getCLBuffer("input_imgs")))
+    # transforms are C-contiguous float32, so reshape(-1) is a view
+    self.model.setInputBuffer("input_imgs", self.frame.prepare(buf, transform.reshape(-1), self.model.getCLBuffer("input_imgs")))
     if wbuf is not None:
-      self.model.setInputBuffer("big_input_imgs", self.wide_frame.prepare(wbuf, transform_wide.flatten(), self.model.getCLBuffer("big_input_imgs")))
+      self.model.setInputBuffer("big_input_imgs", self.wide_frame.prepare(wbuf, transform_wide.reshape(-1), self.model.getCLBuffer("big_input_imgs")))
+    # both frames are enqueued on their own CL queue and run concurrently, wait for both here
+    self.frame.finish()
+    if wbuf is not None:
+      self.wide_frame.finish()
 
     if prepare_only:
       return None
@@ -106,8 +149,9 @@ class ModelState:
     self.model.execute()
     outputs = self.parser.parse_outputs(self.slice_outputs(self.output))
 
-    self.inputs['features_buffer'][:-ModelConstants.FEATURE_LEN] = self.inputs['features_buffer'][ModelConstants.FEATURE_LEN:]
-    self.inputs['features_buffer'][-ModelConstants.FEATURE_LEN:] = outputs['hidden_state'][0, :]
+    self.features_history.push(outputs['hidden_state'][0, :])
+    self.inputs['features_buffer'] = self.features_history.view
+    self.model.setInputBuffer("features_buffer", self.inputs['features_buffer'])
     self.inputs['lat_planner_state'][2] = interp(DT_MDL, ModelConstants.T_IDXS, outputs['lat_planner_solution'][0, :, 2])
     self.inputs['lat_planner_state'][3] = interp(DT_MDL, ModelConstants.T_IDXS, outputs['lat_planner_solution'][0, :, 3])
     return outputs
@@ -161,14 +205,30 @@ def main():
 
   model_transform_main = np.zeros((3, 3), dtype=np.float32)
   model_transform_extra = np.zeros((3, 3), dtype=np.float32)
+  device_from_calib_euler = np.zeros(3, dtype=np.float32)
   live_calib_seen = False
   driving_style = np.array([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0], dtype=np.float32)
   nav_features = np.zeros(ModelConstants.NAV_FEATURE_LEN, dtype=np.float32)
   nav_instructions = np.zeros(ModelConstants.NAV_INSTRUCTION_LEN, dtype=np.float32)
+  traffic_convention = np.array([1, 0], dtype=np.float32)  # LHD until driverMonitoringState says otherwise
+  vec_desire = np.zeros(ModelConstants.DESIRE_LEN, dtype=np.float32)
+  # all inputs are updated in place, so the dict only needs to be built once
+  inputs:Dict[str, np.ndarray] = {
+    'desire': vec_desire,
+    'traffic_convention': traffic_convention,
+    'driving_style': driving_style,
+    'nav_features': nav_features,
+    'nav_instructions': nav_instructions}
   buf_main, buf_extra = None, None
   meta_main = FrameMeta()
   meta_extra = FrameMeta()
 
+  # best effort, everything the loop touches is allocated and connected by now
+  try:
+    lock_memory()
+  except OSError as e:
+    cloudlog.warning(f"failed to lock memory: {e}")
+
   while True:
     # Keep receiving frames until we are at least 1 frame ahead of previous extra frame
     while meta_main.timestamp_sof < meta_extra.timestamp_sof + 25000000:
@@ -206,18 +266,19 @@ def main():
     # TODO: path planner timeout?
     sm.update(0)
     desire = sm["lateralPlan"].desire.raw
-    is_rhd = sm["driverMonitoringState"].isRHD
     frame_id = sm["roadCameraState"].frameId
     if sm.updated["liveCalibration"]:
-      device_from_calib_euler = np.array(sm["liveCalibration"].rpyCalib, dtype=np.float32)
-      model_transform_main = get_warp_matrix(device_from_calib_euler, main_wide_camera, False).astype(np.float32)
-      model_transform_extra = get_warp_matrix(device_from_calib_euler, True, True).astype(np.float32)
+      device_from_calib_euler[:] = sm["liveCalibration"].rpyCalib
+      model_transform_main[:] = get_warp_matrix(device_from_calib_euler, main_wide_camera, False)
+      model_transform_extra[:] = get_warp_matrix(device_from_calib_euler, True, True)
       live_calib_seen = True
 
-    traffic_convention = np.zeros(2)
-    traffic_convention[int(is_rhd)] = 1
+    if sm.updated["driverMonitoringState"]:
+      is_rhd = sm["driverMonitoringState"].isRHD
+      traffic_convention[int(is_rhd)] = 1
+      traffic_convention[int(not is_rhd)] = 0
 
-    vec_desire = np.zeros(ModelConstants.DESIRE_LEN, dtype=np.float32)
+    vec_desire[:] = 0
     if desire >= 0 and desire < ModelConstants.DESIRE_LEN:
       vec_desire[desire] = 1
 
@@ -231,7 +292,7 @@ def main():
       nav_instructions[:] = 0
 
     if nav_enabled and sm.updated["navModel"]:
-      nav_features = np.array(sm["navModel"].features)
+      nav_features[:] = sm["navModel"].features
 
     if nav_enabled and sm.updated["navInstruction"]:
       nav_instructions[:] = 0
@@ -258,13 +319,6 @@ def main():
     if prepare_only:
       cloudlog.error(f"skipping model eval. Dropped {vipc_dropped_frames} frames")
 
-    inputs:Dict[str, np.ndarray] = {
-      'desire': vec_desire,
-      'traffic_convention': traffic_convention,
-      'driving_style': driving_style,
-      'nav_features': nav_features,
-      'nav_instructions': nav_instructions}
-
     mt1 = time.perf_counter()
     model_output = model.run(buf_main, buf_extra, model_transform_main, model_transform_extra, inputs, prepare_only)
     mt2 = time.perf_counter()
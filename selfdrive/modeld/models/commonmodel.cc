@@ -31,17 +31,20 @@ float* ModelFrame::prepare(cl_mem yuv_cl, int frame_width, int frame_height, int
     loadyuv_queue(&loadyuv, q, y_cl, u_cl, v_cl, net_input_cl);
 
     std::memmove(&input_frames[0], &input_frames[MODEL_FRAME_SIZE], sizeof(float) * MODEL_FRAME_SIZE);
-    CL_CHECK(clEnqueueReadBuffer(q, net_input_cl, CL_TRUE, 0, MODEL_FRAME_SIZE * sizeof(float), &input_frames[MODEL_FRAME_SIZE], 0, nullptr, nullptr));
-    clFinish(q);
+    CL_CHECK(clEnqueueReadBuffer(q, net_input_cl, CL_FALSE, 0, MODEL_FRAME_SIZE * sizeof(float), &input_frames[MODEL_FRAME_SIZE], 0, nullptr, nullptr));
     return &input_frames[0];
   } else {
     loadyuv_queue(&loadyuv, q, y_cl, u_cl, v_cl, *output, true);
-    // NOTE: Since thneed is using a different command queue, this clFinish is needed to ensure the image is ready.
-    clFinish(q);
     return NULL;
   }
 }
 
+void ModelFrame::finish() {
+  // NOTE: Since thneed is using a different command queue, this clFinish is needed to ensure the image is ready.
+  // Each ModelFrame has its own queue, so frames prepared before finishing run concurrently on the GPU.
+  CL_CHECK(clFinish(q));
+}
+
 ModelFrame::~ModelFrame() {
   transform_destroy(&transform);
   loadyuv_destroy(&loadyuv);
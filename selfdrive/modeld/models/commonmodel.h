@@ -31,7 +31,9 @@ class ModelFrame {
 public:
   ModelFrame(cl_device_id device_id, cl_context context);
   ~ModelFrame();
+  // prepare only enqueues the work, call finish before using the result
   float* prepare(cl_mem yuv_cl, int width, int height, int frame_stride, int frame_uv_offset, const mat3& transform, cl_mem *output);
+  void finish();
 
   const int MODEL_WIDTH = 512;
   const int MODEL_HEIGHT = 256;
@@ -18,3 +18,4 @@ cdef extern from "selfdrive/modeld/models/commonmodel.h":
     int buf_size
     ModelFrame(cl_device_id, cl_context)
     float * prepare(cl_mem, int, int, int, int, mat3, cl_mem*)
+    void finish()
@@ -41,3 +41,6 @@ cdef class ModelFrame:
     if not data:
       return None
     return np.asarray(<cnp.float32_t[:self.frame.buf_size]> data)
+
+  def finish(self):
+    self.frame.finish()
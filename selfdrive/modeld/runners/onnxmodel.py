@@ -3,8 +3,9 @@ import itertools
 import os
 import sys
 import numpy as np
-from typing import Tuple, Dict, Union, Any
+from typing import Tuple, Dict, List, Union, Any
 
+from openpilot.system.hardware.hw import Paths
 from openpilot.selfdrive.modeld.runners.runmodel_pyx import RunModel
 
 ORT_TYPES_TO_NP_TYPES = {'tensor(float16)': np.float16, 'tensor(float)': np.float32, 'tensor(uint8)': np.uint8}
@@ -38,21 +39,34 @@ def create_ort_session(path, fp16_to_fp32):
   options = ort.SessionOptions()
   options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
 
-  provider: Union[str, Tuple[str, Dict[Any, Any]]]
-  if 'OpenVINOExecutionProvider' in ort.get_available_providers() and 'ONNXCPU' not in os.environ:
-    provider = 'OpenVINOExecutionProvider'
+  # GPU providers have fp16 kernels, so fp16 models only need converting for the others
+  native_fp16 = False
+  providers: List[Union[str, Tuple[str, Dict[Any, Any]]]]
+  if 'TensorrtExecutionProvider' in ort.get_available_providers() and 'ONNXCPU' not in os.environ and 'ONNXNOTRT' not in os.environ:
+    # the first run builds the engine, which can take minutes, so keep it on disk
+    options.intra_op_num_threads = 2
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    native_fp16 = 'ONNXFP32' not in os.environ
+    trt_cache_path = os.path.join(Paths.comma_home(), 'trt_cache')
+    os.makedirs(trt_cache_path, exist_ok=True)
+    trt_options = {'trt_engine_cache_enable': True, 'trt_engine_cache_path': trt_cache_path,
+                   'trt_fp16_enable': native_fp16}
+    providers = [('TensorrtExecutionProvider', trt_options), ('CUDAExecutionProvider', {'cudnn_conv_algo_search': 'DEFAULT'})]
+  elif 'OpenVINOExecutionProvider' in ort.get_available_providers() and 'ONNXCPU' not in os.environ:
+    providers = ['OpenVINOExecutionProvider']
   elif 'CUDAExecutionProvider' in ort.get_available_providers() and 'ONNXCPU' not in os.environ:
     options.intra_op_num_threads = 2
-    provider = ('CUDAExecutionProvider', {'cudnn_conv_algo_search': 'DEFAULT'})
+    native_fp16 = 'ONNXFP32' not in os.environ
+    providers = [('CUDAExecutionProvider', {'cudnn_conv_algo_search': 'DEFAULT'})]
   else:
     options.intra_op_num_threads = 2
     options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
     options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-    provider = 'CPUExecutionProvider'
+    providers = ['CPUExecutionProvider']
 
-  model_data = convert_fp16_to_fp32(path) if fp16_to_fp32 else path
-  print("Onnx selected provider: ", [provider], file=sys.stderr)
-  ort_session = ort.InferenceSession(model_data, options, providers=[provider])
+  model_data = convert_fp16_to_fp32(path) if fp16_to_fp32 and not native_fp16 else path
+  print("Onnx selected provider: ", providers, file=sys.stderr)
+  ort_session = ort.InferenceSession(model_data, options, providers=providers)
   print("Onnx using ", ort_session.get_providers(), file=sys.stderr)
   return ort_session
 
@@ -68,8 +82,19 @@ class ONNXModel(RunModel):
     self.input_shapes = {x.name: [1, *x.shape[1:]] for x in self.session.get_inputs()}
     self.input_dtypes = {x.name: ORT_TYPES_TO_NP_TYPES[x.type] for x in self.session.get_inputs()}
 
-    # run once to initialize CUDA provider
-    if "CUDAExecutionProvider" in self.session.get_providers():
+    # bind the output to host memory so ORT writes straight into it,
+    # only fp16 outputs need to go through a staging buffer
+    assert len(self.session.get_outputs()) == 1, "Only single model outputs are supported"
+    output_info = self.session.get_outputs()[0]
+    output_dtype = ORT_TYPES_TO_NP_TYPES[output_info.type]
+    self.ort_output = self.output if output_dtype == self.output.dtype else np.zeros(self.output.shape, dtype=output_dtype)
+    self.binding = self.session.io_binding()
+    output_shape = [1, *output_info.shape[1:]]
+    assert np.prod(output_shape) == self.output.size, f"model output shape {output_info.shape} doesn't match output buffer size {self.output.size}"
+    self.binding.bind_output(output_info.name, 'cpu', 0, output_dtype, output_shape, self.ort_output.ctypes.data)
+
+    # run once to initialize CUDA/TensorRT provider
+    if {"CUDAExecutionProvider", "TensorrtExecutionProvider"} & set(self.session.get_providers()):
       self.session.run(None, {k: np.zeros(self.input_shapes[k], dtype=self.input_dtypes[k]) for k in self.input_names})
     print("ready to run onnx model", self.input_shapes, file=sys.stderr)
 
@@ -86,8 +111,10 @@ class ONNXModel(RunModel):
 
   def execute(self):
     inputs = {k: (v.view(np.uint8) / 255. if self.use_tf8 and k == 'input_img' else v) for k,v in self.inputs.items()}
-    inputs = {k: v.reshape(self.input_shapes[k]).astype(self.input_dtypes[k]) for k,v in inputs.items()}
-    outputs = self.session.run(None, inputs)
-    assert len(outputs) == 1, "Only single model outputs are supported"
-    self.output[:] = outputs[0]
+    inputs = {k: v.reshape(self.input_shapes[k]).astype(self.input_dtypes[k], copy=False) for k,v in inputs.items()}
+    for k,v in inputs.items():
+      self.binding.bind_cpu_input(k, v)
+    self.session.run_with_iobinding(self.binding)
+    if self.ort_output is not self.output:
+      self.output[:] = self.ort_output
     return self.output
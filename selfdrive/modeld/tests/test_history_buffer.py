@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+
+from openpilot.selfdrive.modeld.modeld import HistoryBuffer
+
+
+class TestHistoryBuffer(unittest.TestCase):
+
+  def test_matches_shift_buffer(self):
+    n, width = 7, 3
+    hb = HistoryBuffer(n, width)
+    expected = np.zeros(n * width, dtype=np.float32)
+    np.testing.assert_array_equal(hb.view, expected)
+
+    for _ in range(300):
+      x = np.random.rand(width).astype(np.float32)
+      expected[:-width] = expected[width:]
+      expected[-width:] = x
+      hb.push(x)
+      self.assertEqual(hb.view.shape, expected.shape)
+      np.testing.assert_array_equal(hb.view, expected)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -34,13 +34,17 @@ void transform_queue(Transform* s,
   // sampled using pixel center origin
   // (because that's how fastcv and opencv does it)
 
-  mat3 projection_y = projection;
+  if (!s->projection_valid || memcmp(s->projection.v, projection.v, sizeof(projection.v)) != 0) {
+    mat3 projection_y = projection;
 
-  // in and out uv is half the size of y.
-  mat3 projection_uv = transform_scale_buffer(projection, 0.5);
+    // in and out uv is half the size of y.
+    mat3 projection_uv = transform_scale_buffer(projection, 0.5);
 
-  CL_CHECK(clEnqueueWriteBuffer(q, s->m_y_cl, CL_TRUE, 0, 3*3*sizeof(float), (void*)projection_y.v, 0, NULL, NULL));
-  CL_CHECK(clEnqueueWriteBuffer(q, s->m_uv_cl, CL_TRUE, 0, 3*3*sizeof(float), (void*)projection_uv.v, 0, NULL, NULL));
+    CL_CHECK(clEnqueueWriteBuffer(q, s->m_y_cl, CL_TRUE, 0, 3*3*sizeof(float), (void*)projection_y.v, 0, NULL, NULL));
+    CL_CHECK(clEnqueueWriteBuffer(q, s->m_uv_cl, CL_TRUE, 0, 3*3*sizeof(float), (void*)projection_uv.v, 0, NULL, NULL));
+    s->projection = projection;
+    s->projection_valid = true;
+  }
 
   const int in_y_width = in_width;
   const int in_y_height = in_height;
@@ -12,6 +12,9 @@
 typedef struct {
   cl_kernel krnl;
   cl_mem m_y_cl, m_uv_cl;
+  // last projection uploaded to m_y_cl/m_uv_cl, it only changes with calibration
+  mat3 projection;
+  bool projection_valid;
 } Transform;
 
 void transform_init(Transform* s, cl_context ctx, cl_device_id device_id);